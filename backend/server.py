@@ -1,14 +1,18 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import asyncio
 import os
+import re
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, AfterValidator
+from typing import Annotated, List, Optional
 import uuid
-from datetime import datetime, timezone, time, date
+from datetime import datetime, timezone, time, date, timedelta
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
 
@@ -20,6 +24,12 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Archival: rows older than the horizon move out of the hot collections
+ARCHIVE_HORIZON_DAYS = int(os.environ.get('ARCHIVE_HORIZON_DAYS', '90'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '500'))
+ARCHIVE_MAX_HORIZON_DAYS = 3650
+ARCHIVE_LEASE_SECONDS = int(os.environ.get('ARCHIVE_LEASE_SECONDS', '300'))
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -27,6 +37,26 @@ app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
 
+# ==================== FIELD TYPES ====================
+
+HHMM_PATTERN = re.compile(r"(\d{1,2}):(\d{2})", re.ASCII)
+
+
+def normalize_hhmm(value: str) -> str:
+    """Validate an HH:MM time of day and return it zero-padded"""
+    match = HHMM_PATTERN.fullmatch(value.strip())
+    if not match:
+        raise ValueError("time must be in HH:MM format")
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+        raise ValueError("time must be between 00:00 and 23:59")
+    return f"{hours:02d}:{minutes:02d}"
+
+
+# Time of day exchanged with clients as "HH:MM", stored as minutes since midnight
+TimeOfDay = Annotated[str, AfterValidator(normalize_hhmm)]
+
+
 # ==================== MODELS ====================
 
 # Guest Model
@@ -77,8 +107,8 @@ class Reservation(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     guest_id: str
     guest_name: str
-    service_date: str  # YYYY-MM-DD format
-    time: str  # HH:MM format
+    service_date: date
+    time: TimeOfDay
     party_size: int
     notes: Optional[str] = None
     status: str = "confirmed"  # confirmed, cancelled, completed
@@ -88,8 +118,8 @@ class Reservation(BaseModel):
 class ReservationCreate(BaseModel):
     guest_id: str
     guest_name: str
-    service_date: str
-    time: str
+    service_date: date
+    time: TimeOfDay
     party_size: int
     notes: Optional[str] = None
     status: str = "confirmed"
@@ -98,8 +128,8 @@ class ReservationCreate(BaseModel):
 class ReservationUpdate(BaseModel):
     guest_id: Optional[str] = None
     guest_name: Optional[str] = None
-    service_date: Optional[str] = None
-    time: Optional[str] = None
+    service_date: Optional[date] = None
+    time: Optional[TimeOfDay] = None
     party_size: Optional[int] = None
     notes: Optional[str] = None
     status: Optional[str] = None
@@ -136,9 +166,9 @@ class StaffSchedule(BaseModel):
     staff_id: str
     staff_name: str
     position: str
-    service_date: str  # YYYY-MM-DD format
-    shift_start: str  # HH:MM format
-    shift_end: str  # HH:MM format
+    service_date: date
+    shift_start: TimeOfDay
+    shift_end: TimeOfDay
     scheduled_hours: float
     hourly_rate: float
     notes: Optional[str] = None
@@ -149,9 +179,9 @@ class StaffScheduleCreate(BaseModel):
     staff_id: str
     staff_name: str
     position: str
-    service_date: str
-    shift_start: str
-    shift_end: str
+    service_date: date
+    shift_start: TimeOfDay
+    shift_end: TimeOfDay
     scheduled_hours: float
     hourly_rate: float
     notes: Optional[str] = None
@@ -161,9 +191,9 @@ class StaffScheduleUpdate(BaseModel):
     staff_id: Optional[str] = None
     staff_name: Optional[str] = None
     position: Optional[str] = None
-    service_date: Optional[str] = None
-    shift_start: Optional[str] = None
-    shift_end: Optional[str] = None
+    service_date: Optional[date] = None
+    shift_start: Optional[TimeOfDay] = None
+    shift_end: Optional[TimeOfDay] = None
     scheduled_hours: Optional[float] = None
     hourly_rate: Optional[float] = None
     notes: Optional[str] = None
@@ -174,7 +204,7 @@ class ServiceConfig(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    service_date: str
+    service_date: date
     expected_walk_in_min: int = 0
     expected_walk_in_max: int = 0
     peak_time_start: Optional[str] = None
@@ -184,7 +214,7 @@ class ServiceConfig(BaseModel):
 
 
 class ServiceConfigCreate(BaseModel):
-    service_date: str
+    service_date: date
     expected_walk_in_min: int = 0
     expected_walk_in_max: int = 0
     peak_time_start: Optional[str] = None
@@ -202,31 +232,484 @@ class ServiceConfigUpdate(BaseModel):
 
 # Briefing Request/Response
 class BriefingRequest(BaseModel):
-    service_date: str
+    service_date: date
+    include_archived: bool = False
 
 
 class BriefingResponse(BaseModel):
-    service_date: str
+    service_date: date
     briefing_text: str
+    rows_needing_repair: int = 0
     generated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+# Rows flagged by the storage migration as holding unparseable dates or times
+class RepairItem(BaseModel):
+    collection: str
+    id: Optional[str] = None
+    values: dict
+
+
+# Archive Run Response
+class ArchiveResponse(BaseModel):
+    cutoff_date: date
+    archived_reservations: int
+    archived_schedules: int
+
+
 # ==================== HELPER FUNCTIONS ====================
 
-def serialize_datetime(obj):
-    """Convert datetime objects to ISO strings for MongoDB"""
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    return obj
+DATE_FIELDS = ('service_date',)
+TIME_FIELDS = ('time', 'shift_start', 'shift_end')
+
+
+def date_to_bson(value: date) -> datetime:
+    """Store a calendar date as a BSON date at midnight UTC"""
+    return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+
+def hhmm_to_minutes(value: str) -> int:
+    """Convert an HH:MM time of day to minutes since midnight"""
+    hours, minutes = normalize_hhmm(value).split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def minutes_to_hhmm(value: int) -> str:
+    """Convert minutes since midnight back to HH:MM"""
+    return f"{value // 60:02d}:{value % 60:02d}"
+
 
+# Formats older free-form rows were entered in, tried after strict HH:MM / ISO
+LEGACY_TIME_FORMATS = ('%H:%M:%S', '%I:%M %p', '%I:%M%p', '%I %p', '%I%p')
+LEGACY_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d')
 
-def deserialize_datetime(doc):
-    """Convert ISO strings back to datetime objects"""
-    if doc and 'created_at' in doc and isinstance(doc['created_at'], str):
-        doc['created_at'] = datetime.fromisoformat(doc['created_at'])
+
+def parse_legacy_time(value: str) -> str:
+    """Parse a legacy free-form time of day into HH:MM"""
+    try:
+        return normalize_hhmm(value)
+    except ValueError:
+        pass
+    for fmt in LEGACY_TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value.strip().upper(), fmt)
+        except ValueError:
+            continue
+        return f"{parsed.hour:02d}:{parsed.minute:02d}"
+    raise ValueError(f"unrecognised time {value!r}")
+
+
+def parse_legacy_date(value: str) -> date:
+    """Parse a legacy free-form service date"""
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        pass
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date {value!r}")
+
+
+# Cleared once the storage migration has converted every parseable service_date
+legacy_date_strings = True
+
+
+def service_date_filter(start: date, end: Optional[date] = None):
+    """Build a service_date query for an inclusive date range.
+
+    While the legacy migration is still running, a string branch also matches
+    documents it has not reached yet; afterwards the query is a plain range.
+    """
+    end = end or start
+    typed = {"service_date": {"$gte": date_to_bson(start), "$lte": date_to_bson(end)}}
+    if not legacy_date_strings:
+        return typed
+    return {"$or": [
+        typed,
+        {"service_date": {"$gte": start.isoformat(), "$lte": end.isoformat()}},
+    ]}
+
+
+def serialize_document(doc):
+    """Convert model fields to their native MongoDB storage types"""
+    for field in DATE_FIELDS:
+        if isinstance(doc.get(field), date) and not isinstance(doc[field], datetime):
+            doc[field] = date_to_bson(doc[field])
+    for field in TIME_FIELDS:
+        if isinstance(doc.get(field), str):
+            doc[field] = hhmm_to_minutes(doc[field])
+    return doc
+
+
+def deserialize_document(doc):
+    """Convert stored BSON dates and minute offsets back to model fields.
+
+    Legacy string values not yet migrated are normalized on the way out; a
+    ValueError means the row holds a value that cannot be parsed at all.
+    """
+    if not doc:
+        return doc
+    for field in DATE_FIELDS:
+        if isinstance(doc.get(field), datetime):
+            doc[field] = doc[field].date()
+        elif isinstance(doc.get(field), str):
+            doc[field] = parse_legacy_date(doc[field])
+    for field in TIME_FIELDS:
+        if isinstance(doc.get(field), int):
+            doc[field] = minutes_to_hhmm(doc[field])
+        elif isinstance(doc.get(field), str):
+            doc[field] = parse_legacy_time(doc[field])
+    created_at = doc.get('created_at')
+    if isinstance(created_at, str):
+        doc['created_at'] = datetime.fromisoformat(created_at)
+    elif isinstance(created_at, datetime) and created_at.tzinfo is None:
+        doc['created_at'] = created_at.replace(tzinfo=timezone.utc)
+    return doc
+
+
+def deserialize_row(doc, label: str):
+    """deserialize_document for single-row reads, reporting unreadable legacy rows as 422"""
+    try:
+        return deserialize_document(doc)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"{label} needs repair: {str(e)}")
+
+
+# ==================== STORAGE MIGRATION ====================
+
+# Fields that older documents stored as strings, per collection
+LEGACY_STRING_FIELDS = {
+    'guests': ('created_at',),
+    'staff': ('created_at',),
+    'reservations': ('service_date', 'time', 'created_at'),
+    'schedules': ('service_date', 'shift_start', 'shift_end', 'created_at'),
+    'service_configs': ('service_date', 'created_at'),
+}
+
+MIGRATION_BATCH_SIZE = 500
+
+
+def convert_legacy_value(field: str, value: str):
+    """Convert a legacy string field to its native storage type"""
+    if field in DATE_FIELDS:
+        return date_to_bson(parse_legacy_date(value))
+    if field in TIME_FIELDS:
+        return hhmm_to_minutes(parse_legacy_time(value))
+    return datetime.fromisoformat(value)
+
+
+async def migrate_collection(name: str, fields):
+    """Rewrite string-typed date/time fields of one collection in batches.
+
+    Each update is guarded on the old values, so documents edited concurrently
+    through the API are left alone rather than overwritten. Values that cannot
+    be parsed keep their strings and the row is flagged with ``needs_repair``;
+    the row's other fields are still converted.
+    """
+    collection = db[name]
+    legacy_query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    last_id = None
+    migrated = 0
+    flagged = 0
+
+    while True:
+        query = dict(legacy_query)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(
+            query, {field: 1 for field in fields}
+        ).sort("_id", 1).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        operations = []
+        for doc in batch:
+            legacy = {f: doc[f] for f in fields if isinstance(doc.get(f), str)}
+            converted = {}
+            for field, value in legacy.items():
+                try:
+                    converted[field] = convert_legacy_value(field, value)
+                except ValueError as e:
+                    logger.warning(f"Flagging {name} document {doc['_id']} for repair: {str(e)}")
+                    converted['needs_repair'] = True
+            if converted.get('needs_repair'):
+                flagged += 1
+            operations.append(UpdateOne({"_id": doc["_id"], **legacy}, {"$set": converted}))
+
+        result = await collection.bulk_write(operations, ordered=False)
+        migrated += result.modified_count
+
+    if migrated:
+        logger.info(f"Migrated {migrated} {name} documents to native date/time fields")
+    if flagged:
+        logger.warning(f"{flagged} {name} documents need manual date/time repair, see GET /api/repairs")
+
+
+async def migrate_legacy_documents():
+    """Online migration of string dates and times to native storage types.
+
+    Once every collection has been migrated, service_date queries drop their
+    legacy string branch; service dates left as strings are unparseable and
+    reachable only through the repair listing.
+    """
+    global legacy_date_strings
+    completed = True
+    for name, fields in LEGACY_STRING_FIELDS.items():
+        try:
+            await migrate_collection(name, fields)
+        except Exception as e:
+            completed = False
+            logger.error(f"Error migrating {name}: {str(e)}")
+    if completed:
+        legacy_date_strings = False
+
+
+async def find_repair_rows():
+    """Rows the migration flagged with ``needs_repair``, across all collections"""
+    items = []
+    for name, fields in LEGACY_STRING_FIELDS.items():
+        projection = {"_id": 0, "id": 1, **{field: 1 for field in fields}}
+        for doc in await db[name].find({"needs_repair": True}, projection).to_list(1000):
+            items.append(RepairItem(
+                collection=name,
+                id=doc.pop('id', None),
+                values={k: v for k, v in doc.items() if isinstance(v, str)}
+            ))
+    return items
+
+
+async def clear_repair_flag(collection, doc):
+    """Drop ``needs_repair`` from a row once all of its dates and times parse"""
+    if not doc or not doc.pop('needs_repair', False):
+        return doc
+    try:
+        deserialize_document(dict(doc))
+    except ValueError:
+        return doc
+    await collection.update_one({"id": doc['id']}, {"$unset": {"needs_repair": ""}})
     return doc
 
 
+# Indexes shared by each hot collection and its archive buckets
+SERVICE_INDEXES = {
+    'reservations': (
+        [("service_date", 1), ("time", 1)],
+        [("guest_id", 1), ("service_date", -1)],
+        [("id", 1)],
+    ),
+    'schedules': ([("service_date", 1), ("shift_start", 1)], [("id", 1)]),
+}
+
+
+async def ensure_indexes():
+    """Create indexes backing service_date range scans and time-ordered reads"""
+    for name, indexes in SERVICE_INDEXES.items():
+        for keys in indexes:
+            await db[name].create_index(keys)
+    await db.service_configs.create_index("service_date")
+
+
+# ==================== ARCHIVAL ====================
+
+# Which rows of each hot collection are eligible once past the horizon
+ARCHIVE_POLICIES = {
+    'reservations': {"status": {"$in": ["completed", "cancelled"]}},
+    'schedules': {},
+}
+
+
+async def acquire_archive_lease(owner: str) -> bool:
+    """Take the archive lease shared by all workers; False if another run holds it"""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.archive_leases.update_one(
+            {"_id": "archive", "expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ARCHIVE_LEASE_SECONDS)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def renew_archive_lease(owner: str) -> bool:
+    """Extend a held archive lease; False if it expired and was taken over"""
+    result = await db.archive_leases.update_one(
+        {"_id": "archive", "owner": owner},
+        {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=ARCHIVE_LEASE_SECONDS)}}
+    )
+    return result.matched_count == 1
+
+
+async def release_archive_lease(owner: str):
+    await db.archive_leases.delete_one({"_id": "archive", "owner": owner})
+
+
+def archive_collection_name(name: str, service_date: datetime) -> str:
+    """Monthly archive bucket holding a row with the given service date"""
+    return f"{name}_archive_{service_date.year:04d}_{service_date.month:02d}"
+
+
+async def list_archive_collections(name: str, start: Optional[date] = None, end: Optional[date] = None):
+    """Archive buckets of a collection whose month overlaps [start, end]"""
+    start = start or date.min
+    end = end or date.max
+    names = await db.list_collection_names(
+        filter={"name": {"$regex": f"^{name}_archive_[0-9]{{4}}_[0-9]{{2}}$"}}
+    )
+    buckets = []
+    for bucket in names:
+        year, month = (int(part) for part in bucket.rsplit('_', 2)[1:])
+        if (start.year, start.month) <= (year, month) <= (end.year, end.month):
+            buckets.append(bucket)
+    return sorted(buckets)
+
+
+def service_sort_key(row, sort: list) -> tuple:
+    """Sort key over a deserialized row's date and time-of-day fields"""
+    key = []
+    for field, direction in sort:
+        if field in DATE_FIELDS:
+            value = row[field].toordinal()
+        else:
+            value = hhmm_to_minutes(row[field])
+        key.append(value if direction > 0 else -value)
+    return tuple(key)
+
+
+async def find_service_rows(
+    name: str,
+    query: dict,
+    sort: list,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    include_archived: bool = False,
+    limit: int = 1000
+):
+    """Read rows from a hot collection, optionally merged with its archive buckets.
+
+    ``start`` and ``end`` only narrow which archive buckets are read; ``query``
+    must still carry the service_date filter itself. ``sort`` may only name
+    date and time-of-day fields; when the range spans several buckets it should
+    lead with service_date, so buckets are read in sort order and each is
+    capped at the rows still needed to fill ``limit``. An archived row whose ``id`` is still in the
+    hot collection (an interrupted archive run) is skipped in favour of the
+    hot copy.
+
+    Returns the rows and the number of rows left out because their dates or
+    times cannot be parsed. Rows are re-sorted in Python so legacy strings not
+    yet migrated are ordered with the typed values rather than by BSON type.
+    """
+    rows = await db[name].find(query, {"_id": 0}).sort(sort).to_list(limit)
+    if include_archived:
+        archived = {}
+        buckets = await list_archive_collections(name, start, end)
+        if sort[0][0] == "service_date" and sort[0][1] < 0:
+            buckets.reverse()
+        for bucket in buckets:
+            remaining = limit - len(archived)
+            if remaining <= 0:
+                break
+            for row in await db[bucket].find(query, {"_id": 0}).sort(sort).limit(remaining).to_list(remaining):
+                archived.setdefault(row['id'], row)
+        if archived:
+            still_hot = await db[name].find(
+                {"id": {"$in": list(archived)}}, {"_id": 0, "id": 1}
+            ).to_list(None)
+            for row in still_hot:
+                archived.pop(row['id'], None)
+            rows += archived.values()
+    readable = []
+    for row in rows:
+        try:
+            readable.append(deserialize_document(row))
+        except ValueError as e:
+            logger.warning(f"Skipping unreadable {name} row {row.get('id')}: {str(e)}")
+    readable.sort(key=lambda r: service_sort_key(r, sort))
+    return readable[:limit], len(rows) - len(readable)
+
+
+def set_repair_header(response: Response, needs_repair: int):
+    """Tell list callers how many matching rows were left out pending repair"""
+    if needs_repair:
+        response.headers["X-Rows-Need-Repair"] = str(needs_repair)
+
+
+async def archive_collection(
+    name: str,
+    policy: dict,
+    cutoff: date,
+    batch_size: int,
+    lease_owner: Optional[str] = None
+) -> int:
+    """Move rows dated before the cutoff into monthly archive buckets.
+
+    Works in batches of ``batch_size``: each batch is upserted into its buckets
+    and only then deleted from the hot collection, so an interrupted run is
+    resumed safely by running the job again. The delete matches each row's
+    full copied content; a row edited in the meantime stays hot, its stale
+    archive copy is dropped and it is re-read by the next batch if still due.
+    With ``lease_owner`` set, the archive lease is renewed before every batch
+    and the run stops if the lease was lost.
+    """
+    collection = db[name]
+    # Rows flagged for repair stay hot so they remain listed by GET /api/repairs
+    query = {**policy, "service_date": {"$lt": date_to_bson(cutoff)}, "needs_repair": {"$ne": True}}
+    indexed_buckets = set()
+    archived = 0
+    stalled_batches = 0
+
+    while True:
+        if lease_owner and not await renew_archive_lease(lease_owner):
+            logger.warning(f"Archive lease lost; stopping {name} archive")
+            break
+        batch = await collection.find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        buckets = {}
+        for doc in batch:
+            buckets.setdefault(archive_collection_name(name, doc['service_date']), []).append(doc)
+
+        for bucket, docs in buckets.items():
+            if bucket not in indexed_buckets:
+                for keys in SERVICE_INDEXES[name]:
+                    await db[bucket].create_index(keys)
+                indexed_buckets.add(bucket)
+            await db[bucket].bulk_write(
+                [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs],
+                ordered=False
+            )
+
+        result = await collection.bulk_write([DeleteOne(doc) for doc in batch], ordered=False)
+        archived += result.deleted_count
+
+        if result.deleted_count < len(batch):
+            still_hot = await collection.find(
+                {"_id": {"$in": [doc["_id"] for doc in batch]}}, {"_id": 1}
+            ).to_list(None)
+            still_hot_ids = {doc["_id"] for doc in still_hot}
+            for bucket, docs in buckets.items():
+                stale = [doc["_id"] for doc in docs if doc["_id"] in still_hot_ids]
+                if stale:
+                    await db[bucket].delete_many({"_id": {"$in": stale}})
+
+        # Rows keep changing under the job; leave them for the next run rather than spin
+        stalled_batches = stalled_batches + 1 if result.deleted_count == 0 else 0
+        if stalled_batches >= 3:
+            logger.warning(f"Archive of {name} made no progress; remaining rows are left for the next run")
+            break
+
+    if archived:
+        logger.info(f"Archived {archived} {name} documents dated before {cutoff.isoformat()}")
+    return archived
+
+
 # ==================== GUEST ENDPOINTS ====================
 
 @api_router.post("/guests", response_model=Guest)
@@ -235,7 +718,7 @@ async def create_guest(input: GuestCreate):
     guest_obj = Guest(**guest_dict)
     
     doc = guest_obj.model_dump()
-    doc['created_at'] = serialize_datetime(doc['created_at'])
+    serialize_document(doc)
     
     await db.guests.insert_one(doc)
     return guest_obj
@@ -244,7 +727,7 @@ async def create_guest(input: GuestCreate):
 @api_router.get("/guests", response_model=List[Guest])
 async def get_guests():
     guests = await db.guests.find({}, {"_id": 0}).to_list(1000)
-    return [deserialize_datetime(g) for g in guests]
+    return [deserialize_document(g) for g in guests]
 
 
 @api_router.get("/guests/{guest_id}", response_model=Guest)
@@ -252,7 +735,19 @@ async def get_guest(guest_id: str):
     guest = await db.guests.find_one({"id": guest_id}, {"_id": 0})
     if not guest:
         raise HTTPException(status_code=404, detail="Guest not found")
-    return deserialize_datetime(guest)
+    return deserialize_document(guest)
+
+
+@api_router.get("/guests/{guest_id}/reservations", response_model=List[Reservation])
+async def get_guest_reservations(guest_id: str, response: Response, include_archived: bool = False):
+    reservations, needs_repair = await find_service_rows(
+        "reservations",
+        {"guest_id": guest_id},
+        [("service_date", -1), ("time", -1)],
+        include_archived=include_archived
+    )
+    set_repair_header(response, needs_repair)
+    return reservations
 
 
 @api_router.put("/guests/{guest_id}", response_model=Guest)
@@ -268,7 +763,7 @@ async def update_guest(guest_id: str, input: GuestUpdate):
         raise HTTPException(status_code=404, detail="Guest not found")
     
     guest = await db.guests.find_one({"id": guest_id}, {"_id": 0})
-    return deserialize_datetime(guest)
+    return deserialize_document(guest)
 
 
 @api_router.delete("/guests/{guest_id}")
@@ -289,17 +784,38 @@ async def create_reservation(input: ReservationCreate):
     reservation_obj = Reservation(**reservation_dict)
     
     doc = reservation_obj.model_dump()
-    doc['created_at'] = serialize_datetime(doc['created_at'])
+    serialize_document(doc)
     
     await db.reservations.insert_one(doc)
     return reservation_obj
 
 
 @api_router.get("/reservations", response_model=List[Reservation])
-async def get_reservations(service_date: Optional[str] = None):
-    query = {"service_date": service_date} if service_date else {}
-    reservations = await db.reservations.find(query, {"_id": 0}).to_list(1000)
-    return [deserialize_datetime(r) for r in reservations]
+async def get_reservations(
+    response: Response,
+    service_date: Optional[date] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    include_archived: bool = False
+):
+    if service_date:
+        start_date = end_date = service_date
+    if include_archived and not (start_date and end_date):
+        raise HTTPException(status_code=400, detail="include_archived requires service_date or start_date and end_date")
+    if start_date or end_date:
+        query = service_date_filter(start_date or date.min, end_date or date.max)
+    else:
+        query = {}
+    reservations, needs_repair = await find_service_rows(
+        "reservations",
+        query,
+        [("service_date", 1), ("time", 1)],
+        start_date,
+        end_date,
+        include_archived
+    )
+    set_repair_header(response, needs_repair)
+    return reservations
 
 
 @api_router.get("/reservations/{reservation_id}", response_model=Reservation)
@@ -307,7 +823,7 @@ async def get_reservation(reservation_id: str):
     reservation = await db.reservations.find_one({"id": reservation_id}, {"_id": 0})
     if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
-    return deserialize_datetime(reservation)
+    return deserialize_row(reservation, "Reservation")
 
 
 @api_router.put("/reservations/{reservation_id}", response_model=Reservation)
@@ -317,13 +833,14 @@ async def update_reservation(reservation_id: str, input: ReservationUpdate):
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    result = await db.reservations.update_one({"id": reservation_id}, {"$set": update_data})
+    result = await db.reservations.update_one({"id": reservation_id}, {"$set": serialize_document(update_data)})
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Reservation not found")
     
     reservation = await db.reservations.find_one({"id": reservation_id}, {"_id": 0})
-    return deserialize_datetime(reservation)
+    await clear_repair_flag(db.reservations, reservation)
+    return deserialize_row(reservation, "Reservation")
 
 
 @api_router.delete("/reservations/{reservation_id}")
@@ -344,7 +861,7 @@ async def create_staff(input: StaffCreate):
     staff_obj = Staff(**staff_dict)
     
     doc = staff_obj.model_dump()
-    doc['created_at'] = serialize_datetime(doc['created_at'])
+    serialize_document(doc)
     
     await db.staff.insert_one(doc)
     return staff_obj
@@ -353,7 +870,7 @@ async def create_staff(input: StaffCreate):
 @api_router.get("/staff", response_model=List[Staff])
 async def get_staff():
     staff = await db.staff.find({}, {"_id": 0}).to_list(1000)
-    return [deserialize_datetime(s) for s in staff]
+    return [deserialize_document(s) for s in staff]
 
 
 @api_router.get("/staff/{staff_id}", response_model=Staff)
@@ -361,7 +878,7 @@ async def get_staff_member(staff_id: str):
     staff = await db.staff.find_one({"id": staff_id}, {"_id": 0})
     if not staff:
         raise HTTPException(status_code=404, detail="Staff member not found")
-    return deserialize_datetime(staff)
+    return deserialize_document(staff)
 
 
 @api_router.put("/staff/{staff_id}", response_model=Staff)
@@ -377,7 +894,7 @@ async def update_staff(staff_id: str, input: StaffUpdate):
         raise HTTPException(status_code=404, detail="Staff member not found")
     
     staff = await db.staff.find_one({"id": staff_id}, {"_id": 0})
-    return deserialize_datetime(staff)
+    return deserialize_document(staff)
 
 
 @api_router.delete("/staff/{staff_id}")
@@ -398,17 +915,38 @@ async def create_schedule(input: StaffScheduleCreate):
     schedule_obj = StaffSchedule(**schedule_dict)
     
     doc = schedule_obj.model_dump()
-    doc['created_at'] = serialize_datetime(doc['created_at'])
+    serialize_document(doc)
     
     await db.schedules.insert_one(doc)
     return schedule_obj
 
 
 @api_router.get("/schedules", response_model=List[StaffSchedule])
-async def get_schedules(service_date: Optional[str] = None):
-    query = {"service_date": service_date} if service_date else {}
-    schedules = await db.schedules.find(query, {"_id": 0}).to_list(1000)
-    return [deserialize_datetime(s) for s in schedules]
+async def get_schedules(
+    response: Response,
+    service_date: Optional[date] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    include_archived: bool = False
+):
+    if service_date:
+        start_date = end_date = service_date
+    if include_archived and not (start_date and end_date):
+        raise HTTPException(status_code=400, detail="include_archived requires service_date or start_date and end_date")
+    if start_date or end_date:
+        query = service_date_filter(start_date or date.min, end_date or date.max)
+    else:
+        query = {}
+    schedules, needs_repair = await find_service_rows(
+        "schedules",
+        query,
+        [("service_date", 1), ("shift_start", 1)],
+        start_date,
+        end_date,
+        include_archived
+    )
+    set_repair_header(response, needs_repair)
+    return schedules
 
 
 @api_router.put("/schedules/{schedule_id}", response_model=StaffSchedule)
@@ -418,13 +956,14 @@ async def update_schedule(schedule_id: str, input: StaffScheduleUpdate):
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    result = await db.schedules.update_one({"id": schedule_id}, {"$set": update_data})
+    result = await db.schedules.update_one({"id": schedule_id}, {"$set": serialize_document(update_data)})
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Schedule not found")
     
     schedule = await db.schedules.find_one({"id": schedule_id}, {"_id": 0})
-    return deserialize_datetime(schedule)
+    await clear_repair_flag(db.schedules, schedule)
+    return deserialize_row(schedule, "Schedule")
 
 
 @api_router.delete("/schedules/{schedule_id}")
@@ -442,7 +981,7 @@ async def delete_schedule(schedule_id: str):
 @api_router.post("/service-config", response_model=ServiceConfig)
 async def create_service_config(input: ServiceConfigCreate):
     # Check if config already exists for this date
-    existing = await db.service_configs.find_one({"service_date": input.service_date})
+    existing = await db.service_configs.find_one(service_date_filter(input.service_date))
     if existing:
         raise HTTPException(status_code=400, detail="Service config already exists for this date. Use PUT to update.")
     
@@ -450,34 +989,67 @@ async def create_service_config(input: ServiceConfigCreate):
     config_obj = ServiceConfig(**config_dict)
     
     doc = config_obj.model_dump()
-    doc['created_at'] = serialize_datetime(doc['created_at'])
+    serialize_document(doc)
     
     await db.service_configs.insert_one(doc)
     return config_obj
 
 
 @api_router.get("/service-config", response_model=Optional[ServiceConfig])
-async def get_service_config(service_date: str):
-    config = await db.service_configs.find_one({"service_date": service_date}, {"_id": 0})
+async def get_service_config(service_date: date):
+    config = await db.service_configs.find_one(service_date_filter(service_date), {"_id": 0})
     if not config:
         return None
-    return deserialize_datetime(config)
+    return deserialize_row(config, "Service config")
 
 
 @api_router.put("/service-config/{service_date}", response_model=ServiceConfig)
-async def update_service_config(service_date: str, input: ServiceConfigUpdate):
+async def update_service_config(service_date: date, input: ServiceConfigUpdate):
     update_data = {k: v for k, v in input.model_dump().items() if v is not None}
     
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    result = await db.service_configs.update_one({"service_date": service_date}, {"$set": update_data})
+    result = await db.service_configs.update_one(service_date_filter(service_date), {"$set": update_data})
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Service config not found")
     
-    config = await db.service_configs.find_one({"service_date": service_date}, {"_id": 0})
-    return deserialize_datetime(config)
+    config = await db.service_configs.find_one(service_date_filter(service_date), {"_id": 0})
+    return deserialize_row(config, "Service config")
+
+
+# ==================== REPAIR ENDPOINTS ====================
+
+@api_router.get("/repairs", response_model=List[RepairItem])
+async def get_repairs():
+    return await find_repair_rows()
+
+
+# ==================== ARCHIVE ENDPOINTS ====================
+
+@api_router.post("/archive", response_model=ArchiveResponse)
+async def run_archive(
+    horizon_days: int = Query(ARCHIVE_HORIZON_DAYS, ge=1, le=ARCHIVE_MAX_HORIZON_DAYS)
+):
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=horizon_days)
+    owner = str(uuid.uuid4())
+    
+    if not await acquire_archive_lease(owner):
+        raise HTTPException(status_code=409, detail="Archive job already running")
+    
+    try:
+        archived = {}
+        for name, policy in ARCHIVE_POLICIES.items():
+            archived[name] = await archive_collection(name, policy, cutoff, ARCHIVE_BATCH_SIZE, owner)
+    finally:
+        await release_archive_lease(owner)
+    
+    return ArchiveResponse(
+        cutoff_date=cutoff,
+        archived_reservations=archived['reservations'],
+        archived_schedules=archived['schedules']
+    )
 
 
 # ==================== BRIEFING GENERATION ENDPOINT ====================
@@ -487,20 +1059,29 @@ async def generate_briefing(request: BriefingRequest):
     service_date = request.service_date
     
     # Fetch all relevant data for the service date
-    reservations = await db.reservations.find(
-        {"service_date": service_date, "status": "confirmed"}, 
-        {"_id": 0}
-    ).to_list(1000)
+    reservations, reservations_needing_repair = await find_service_rows(
+        "reservations",
+        {**service_date_filter(service_date), "status": "confirmed"},
+        [("time", 1)],
+        service_date,
+        service_date,
+        request.include_archived
+    )
     
-    schedules = await db.schedules.find(
-        {"service_date": service_date}, 
-        {"_id": 0}
-    ).to_list(1000)
+    schedules, schedules_needing_repair = await find_service_rows(
+        "schedules",
+        service_date_filter(service_date),
+        [("shift_start", 1)],
+        service_date,
+        service_date,
+        request.include_archived
+    )
     
     service_config = await db.service_configs.find_one(
-        {"service_date": service_date}, 
+        service_date_filter(service_date), 
         {"_id": 0}
     )
+    rows_needing_repair = reservations_needing_repair + schedules_needing_repair
     
     # Fetch guest details for reservations
     guest_ids = [r['guest_id'] for r in reservations]
@@ -540,10 +1121,10 @@ async def generate_briefing(request: BriefingRequest):
                     'notes': reservation.get('notes', '')
                 })
     
-    # Group reservations by time to identify peak periods
+    # Group reservations into 15-minute windows to identify peak periods
     time_slots = {}
     for r in reservations:
-        time_slot = r['time']
+        time_slot = minutes_to_hhmm(hhmm_to_minutes(r['time']) // 15 * 15)
         if time_slot not in time_slots:
             time_slots[time_slot] = 0
         time_slots[time_slot] += r['party_size']
@@ -586,6 +1167,7 @@ RESERVATIONS DATA:
 - Total booked covers: {total_booked_covers}
 - Expected walk-ins: {walk_in_min}-{walk_in_max}
 - Total expected guest range: {total_expected_min}-{total_expected_max}
+{f"- Data gap: {reservations_needing_repair} reservations and {schedules_needing_repair} staff shifts have unreadable dates or times and are NOT included above; mention that they need repair" if rows_needing_repair else ""}
 
 PEAK PERIODS:
 {chr(10).join([f"- {time}: {covers} covers" for time, covers in peak_times]) if peak_times else "- No clear peak identified"}
@@ -649,7 +1231,8 @@ Phrase actions as suggestions, not instructions."""
         
         return BriefingResponse(
             service_date=service_date,
-            briefing_text=briefing_text
+            briefing_text=briefing_text,
+            rows_needing_repair=rows_needing_repair
         )
         
     except Exception as e:
@@ -682,6 +1265,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def prepare_storage():
+    await ensure_indexes()
+    app.state.migration_task = asyncio.create_task(migrate_legacy_documents())
+
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
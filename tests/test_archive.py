@@ -0,0 +1,222 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+mongomock = pytest.importorskip("mongomock")
+
+import server  # noqa: E402
+
+
+# ==================== async mongomock adapter ====================
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args):
+        self._cursor = self._cursor.sort(*args)
+        return self
+
+    def limit(self, count):
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    async def to_list(self, length):
+        docs = list(self._cursor)
+        return docs if length is None else docs[:length]
+
+
+class AsyncCollection:
+    def __init__(self, collection, before_bulk_write=None):
+        self._collection = collection
+        self._before_bulk_write = before_bulk_write
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+    async def bulk_write(self, operations, ordered=True):
+        if self._before_bulk_write:
+            self._before_bulk_write()
+        return self._collection.bulk_write(operations, ordered=ordered)
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class AsyncDatabase:
+    def __init__(self):
+        self.sync = mongomock.MongoClient().db
+        self.hooks = {}
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.sync[name], self.hooks.get(name))
+
+    def __getattr__(self, name):
+        return self[name]
+
+    async def list_collection_names(self, filter=None):
+        return self.sync.list_collection_names(filter=filter)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = AsyncDatabase()
+    monkeypatch.setattr(server, "db", database)
+    return database
+
+
+def stored_reservation(id, service_date, time="19:00", status="completed", **extra):
+    return server.serialize_document({
+        "id": id,
+        "guest_id": "g1",
+        "guest_name": "Ada",
+        "service_date": service_date,
+        "time": time,
+        "party_size": 2,
+        "notes": None,
+        "status": status,
+        "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        **extra,
+    })
+
+
+# ==================== list_archive_collections ====================
+
+def test_list_archive_collections_selects_overlapping_months(db):
+    for bucket in (
+        "reservations_archive_2024_11",
+        "reservations_archive_2024_12",
+        "reservations_archive_2025_01",
+        "reservations_archive_2025_02",
+        "schedules_archive_2024_12",
+        "reservations_archive_old",
+    ):
+        db.sync[bucket].insert_one({"id": bucket})
+
+    selected = asyncio.run(server.list_archive_collections(
+        "reservations", date(2024, 12, 15), date(2025, 1, 3)
+    ))
+    assert selected == ["reservations_archive_2024_12", "reservations_archive_2025_01"]
+
+    unbounded = asyncio.run(server.list_archive_collections("reservations"))
+    assert unbounded == [
+        "reservations_archive_2024_11",
+        "reservations_archive_2024_12",
+        "reservations_archive_2025_01",
+        "reservations_archive_2025_02",
+    ]
+
+
+# ==================== service_sort_key ====================
+
+def test_service_sort_key_handles_descending_directions():
+    rows = [
+        {"id": "a", "service_date": date(2024, 1, 5), "time": "18:00"},
+        {"id": "b", "service_date": date(2024, 1, 6), "time": "09:30"},
+        {"id": "c", "service_date": date(2024, 1, 5), "time": "21:15"},
+        {"id": "d", "service_date": date(2023, 12, 31), "time": "23:59"},
+    ]
+
+    newest_first = sorted(rows, key=lambda r: server.service_sort_key(r, [("service_date", -1), ("time", -1)]))
+    assert [r["id"] for r in newest_first] == ["b", "c", "a", "d"]
+
+    mixed = sorted(rows, key=lambda r: server.service_sort_key(r, [("service_date", -1), ("time", 1)]))
+    assert [r["id"] for r in mixed] == ["b", "a", "c", "d"]
+
+
+# ==================== archive_collection ====================
+
+def test_archive_collection_moves_eligible_rows_into_monthly_buckets(db):
+    db.sync.reservations.insert_many([
+        stored_reservation("old-done", date(2024, 1, 5)),
+        stored_reservation("old-cancelled", date(2024, 2, 10), status="cancelled"),
+        stored_reservation("old-confirmed", date(2024, 1, 6), status="confirmed"),
+        stored_reservation("recent", date(2024, 6, 1)),
+    ])
+
+    archived = asyncio.run(server.archive_collection(
+        "reservations", server.ARCHIVE_POLICIES["reservations"], date(2024, 3, 1), batch_size=1
+    ))
+
+    assert archived == 2
+    assert sorted(r["id"] for r in db.sync.reservations.find()) == ["old-confirmed", "recent"]
+    assert [r["id"] for r in db.sync.reservations_archive_2024_01.find()] == ["old-done"]
+    assert [r["id"] for r in db.sync.reservations_archive_2024_02.find()] == ["old-cancelled"]
+
+
+def test_archive_collection_keeps_row_edited_out_of_policy_mid_batch(db):
+    db.sync.reservations.insert_many([
+        stored_reservation("stable", date(2024, 1, 5)),
+        stored_reservation("reopened", date(2024, 1, 7)),
+    ])
+
+    def reopen_during_copy():
+        db.sync.reservations.update_one({"id": "reopened"}, {"$set": {"status": "confirmed"}})
+        db.hooks.clear()
+    db.hooks["reservations_archive_2024_01"] = reopen_during_copy
+
+    archived = asyncio.run(server.archive_collection(
+        "reservations", server.ARCHIVE_POLICIES["reservations"], date(2024, 3, 1), batch_size=10
+    ))
+
+    assert archived == 1
+    hot = db.sync.reservations.find_one({"id": "reopened"})
+    assert hot["status"] == "confirmed"
+    assert [r["id"] for r in db.sync.reservations_archive_2024_01.find()] == ["stable"]
+
+
+def test_archive_collection_rearchives_row_edited_within_policy(db):
+    db.sync.reservations.insert_one(stored_reservation("edited", date(2024, 1, 5)))
+
+    def edit_during_copy():
+        db.sync.reservations.update_one({"id": "edited"}, {"$set": {"notes": "window seat"}})
+        db.hooks.clear()
+    db.hooks["reservations_archive_2024_01"] = edit_during_copy
+
+    archived = asyncio.run(server.archive_collection(
+        "reservations", server.ARCHIVE_POLICIES["reservations"], date(2024, 3, 1), batch_size=10
+    ))
+
+    assert archived == 1
+    assert db.sync.reservations.count_documents({}) == 0
+    assert [r["notes"] for r in db.sync.reservations_archive_2024_01.find()] == ["window seat"]
+
+
+def test_archive_collection_leaves_rows_flagged_for_repair_hot(db):
+    db.sync.reservations.insert_one(stored_reservation("flagged", date(2024, 1, 5), needs_repair=True))
+
+    archived = asyncio.run(server.archive_collection(
+        "reservations", server.ARCHIVE_POLICIES["reservations"], date(2024, 3, 1), batch_size=10
+    ))
+
+    assert archived == 0
+    assert db.sync.reservations.count_documents({"id": "flagged"}) == 1
+
+
+# ==================== find_service_rows ====================
+
+def test_find_service_rows_prefers_hot_copy_of_archived_row(db, monkeypatch):
+    monkeypatch.setattr(server, "legacy_date_strings", False)
+    db.sync.reservations.insert_one(stored_reservation("both", date(2024, 1, 5), time="20:00"))
+    db.sync.reservations_archive_2024_01.insert_many([
+        stored_reservation("both", date(2024, 1, 5), time="19:00"),
+        stored_reservation("archived", date(2024, 1, 4)),
+    ])
+
+    rows, needs_repair = asyncio.run(server.find_service_rows(
+        "reservations",
+        server.service_date_filter(date(2024, 1, 1), date(2024, 1, 31)),
+        [("service_date", 1), ("time", 1)],
+        date(2024, 1, 1),
+        date(2024, 1, 31),
+        include_archived=True
+    ))
+
+    assert needs_repair == 0
+    assert [(r["id"], r["time"]) for r in rows] == [("archived", "19:00"), ("both", "20:00")]
@@ -0,0 +1,140 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+import server  # noqa: E402
+
+
+# ==================== normalize_hhmm ====================
+
+@pytest.mark.parametrize("value, expected", [
+    ("19:30", "19:30"),
+    ("7:05", "07:05"),
+    (" 00:00 ", "00:00"),
+    ("23:59", "23:59"),
+])
+def test_normalize_hhmm_accepts_valid_times(value, expected):
+    assert server.normalize_hhmm(value) == expected
+
+
+@pytest.mark.parametrize("value", ["24:00", "12:60", "7:5", "7", "ab:cd", "123:00", "١٢:30", "12:٣٠"])
+def test_normalize_hhmm_rejects_invalid_times(value):
+    with pytest.raises(ValueError):
+        server.normalize_hhmm(value)
+
+
+# ==================== legacy parsing ====================
+
+@pytest.mark.parametrize("value, expected", [
+    ("19:30", "19:30"),
+    ("7:30 PM", "19:30"),
+    ("7:30pm", "19:30"),
+    ("12:15 am", "00:15"),
+    ("19:30:00", "19:30"),
+    ("7 pm", "19:00"),
+])
+def test_parse_legacy_time(value, expected):
+    assert server.parse_legacy_time(value) == expected
+
+
+@pytest.mark.parametrize("value", ["7ish", "24:00", "7:5", ""])
+def test_parse_legacy_time_rejects_unparseable(value):
+    with pytest.raises(ValueError):
+        server.parse_legacy_time(value)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-01-05", date(2024, 1, 5)),
+    ("2024-1-5", date(2024, 1, 5)),
+    ("2024/01/05", date(2024, 1, 5)),
+    ("2024-01-05T18:00:00", date(2024, 1, 5)),
+])
+def test_parse_legacy_date(value, expected):
+    assert server.parse_legacy_date(value) == expected
+
+
+@pytest.mark.parametrize("value", ["05/01/2024", "tomorrow", "2024-13-01"])
+def test_parse_legacy_date_rejects_unparseable(value):
+    with pytest.raises(ValueError):
+        server.parse_legacy_date(value)
+
+
+def test_convert_legacy_value():
+    assert server.convert_legacy_value("service_date", "2024/01/05") == datetime(2024, 1, 5, tzinfo=timezone.utc)
+    assert server.convert_legacy_value("time", "7:30 PM") == 19 * 60 + 30
+    assert server.convert_legacy_value("shift_end", "23:15") == 23 * 60 + 15
+    assert server.convert_legacy_value("created_at", "2024-01-05T10:00:00+00:00") == datetime(
+        2024, 1, 5, 10, tzinfo=timezone.utc
+    )
+    with pytest.raises(ValueError):
+        server.convert_legacy_value("time", "7ish")
+
+
+# ==================== document round trip ====================
+
+def test_serialize_document_uses_native_storage_types():
+    doc = server.serialize_document({
+        "service_date": date(2025, 12, 13),
+        "shift_start": "16:00",
+        "shift_end": "23:30",
+        "notes": "close",
+    })
+
+    assert doc == {
+        "service_date": datetime(2025, 12, 13, tzinfo=timezone.utc),
+        "shift_start": 960,
+        "shift_end": 1410,
+        "notes": "close",
+    }
+
+
+def test_deserialize_document_round_trips_stored_values():
+    created_at = datetime(2025, 12, 1, 9, 30, tzinfo=timezone.utc)
+    stored = server.serialize_document({
+        "service_date": date(2025, 12, 13),
+        "time": "19:45",
+        "created_at": created_at,
+    })
+    # MongoDB hands BSON dates back as naive UTC datetimes
+    stored["service_date"] = stored["service_date"].replace(tzinfo=None)
+    stored["created_at"] = stored["created_at"].replace(tzinfo=None)
+
+    assert server.deserialize_document(stored) == {
+        "service_date": date(2025, 12, 13),
+        "time": "19:45",
+        "created_at": created_at,
+    }
+
+
+def test_deserialize_document_normalizes_unmigrated_strings():
+    doc = server.deserialize_document({
+        "service_date": "2024-1-5",
+        "time": "7:30 PM",
+        "created_at": "2024-01-01T12:00:00+00:00",
+    })
+
+    assert doc["service_date"] == date(2024, 1, 5)
+    assert doc["time"] == "19:30"
+    assert doc["created_at"] == datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def test_deserialize_document_rejects_unparseable_strings():
+    with pytest.raises(ValueError):
+        server.deserialize_document({"service_date": "2024-01-05", "time": "7ish"})
+
+
+# ==================== service_date_filter ====================
+
+def test_service_date_filter_drops_string_branch_after_migration(monkeypatch):
+    monkeypatch.setattr(server, "legacy_date_strings", True)
+    during = server.service_date_filter(date(2024, 1, 5))
+    assert len(during["$or"]) == 2
+
+    monkeypatch.setattr(server, "legacy_date_strings", False)
+    after = server.service_date_filter(date(2024, 1, 1), date(2024, 1, 31))
+    assert after == {"service_date": {
+        "$gte": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "$lte": datetime(2024, 1, 31, tzinfo=timezone.utc),
+    }}